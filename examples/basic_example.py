@@ -7,8 +7,10 @@ import random
 from pathlib import Path
 import sys
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+# Add src to path (once; skipped when the package is installed)
+_SRC = str(Path(__file__).resolve().parent.parent / "src")
+if _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
 
 from openclaw_observability import observe, trace, init_tracer, get_tracer
 from openclaw_observability.span import SpanType
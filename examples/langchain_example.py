@@ -8,7 +8,10 @@ import os
 from pathlib import Path
 import sys
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+# Add src to path (once; skipped when the package is installed)
+_SRC = str(Path(__file__).resolve().parent.parent / "src")
+if _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
 
 try:
     from langchain.llms import OpenAI
@@ -4,8 +4,11 @@ OpenClaw Observability Web Server
 Simple Flask server for visualizing traces.
 """
 
-from flask import Flask, jsonify, render_template_string, send_from_directory
+from flask import Flask, Response, jsonify, render_template_string, request, send_from_directory
 from pathlib import Path
+import gzip
+import hashlib
+import mimetypes
 import sys
 
 # Add src to path
@@ -14,23 +17,43 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from openclaw_observability.storage import FileStorage
 
 
-app = Flask(__name__)
+# Static files go through serve_static below, not Flask's built-in route
+app = Flask(__name__, static_folder=None)
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 86400
 storage = FileStorage()
 
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Text assets are gzipped once at startup: relative path -> (body, etag)
+_GZIP_SUFFIXES = {".html", ".css", ".js"}
+_GZIPPED_STATIC = {}
+for _path in STATIC_DIR.rglob("*"):
+    if _path.suffix in _GZIP_SUFFIXES:
+        _body = gzip.compress(_path.read_bytes(), 6)
+        _GZIPPED_STATIC[_path.relative_to(STATIC_DIR).as_posix()] = (
+            _body,
+            hashlib.sha1(_body).hexdigest(),
+        )
+
+# Pages never change while the server runs, so read them once
+_INDEX_HTML = (STATIC_DIR / "index.html").read_bytes()
+_VIEWER_PARTS = (STATIC_DIR / "trace-viewer.html").read_bytes().split(b"{{TRACE_ID}}")
+_PAGE_HEADERS = {
+    "Content-Type": "text/html; charset=utf-8",
+    "Cache-Control": "public, max-age=300",
+}
+
 
 @app.route("/")
 def index():
     """Serve main trace list page."""
-    with open(Path(__file__).parent / "static" / "index.html") as f:
-        return f.read()
+    return _INDEX_HTML, _PAGE_HEADERS
 
 
 @app.route("/trace/<trace_id>")
 def trace_view(trace_id):
     """Serve trace detail page."""
-    with open(Path(__file__).parent / "static" / "trace-viewer.html") as f:
-        html = f.read()
-        return html.replace("{{TRACE_ID}}", trace_id)
+    return trace_id.encode().join(_VIEWER_PARTS), _PAGE_HEADERS
 
 
 @app.route("/api/traces")
@@ -49,8 +72,22 @@ def get_trace(trace_id):
 
 @app.route("/static/<path:path>")
 def serve_static(path):
-    """Serve static files."""
-    return send_from_directory(Path(__file__).parent / "static", path)
+    """Serve static files, gzipped when the client accepts it."""
+    gzipped = _GZIPPED_STATIC.get(path)
+    if gzipped is None or "gzip" not in request.accept_encodings:
+        response = send_from_directory(STATIC_DIR, path)
+    else:
+        body, etag = gzipped
+        response = Response(body, mimetype=mimetypes.guess_type(path)[0])
+        response.headers["Content-Encoding"] = "gzip"
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config["SEND_FILE_MAX_AGE_DEFAULT"]
+        response.set_etag(etag)
+        response = response.make_conditional(request)
+    
+    if gzipped is not None:
+        response.vary.add("Accept-Encoding")
+    return response
 
 
 if __name__ == "__main__":
@@ -32,6 +32,7 @@ setup(
     ],
     extras_require={
         "langchain": ["langchain>=0.1.0"],
+        "fast": ["orjson>=3.9.0"],
         "dev": ["pytest>=7.0.0", "black>=22.0.0", "flake8>=4.0.0"],
     },
     entry_points={
@@ -2,6 +2,8 @@
 LangChain integration for automatic tracing.
 """
 
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 import time
 
@@ -12,9 +14,52 @@ try:
 except ImportError:
     LANGCHAIN_AVAILABLE = False
     BaseCallbackHandler = object
+    AgentAction = AgentFinish = LLMResult = Any
 
 from ..tracer import get_tracer
-from ..span import SpanType, LLMCall
+from ..span import SpanType, LLMCall, _DATACLASS_OPTIONS, _MAX_INPUT_CHARS
+
+
+def _cap(value: Any) -> tuple:
+    """Cut long strings (also inside lists) to _MAX_INPUT_CHARS; returns (value, truncated)."""
+    if isinstance(value, str):
+        if len(value) > _MAX_INPUT_CHARS:
+            return value[:_MAX_INPUT_CHARS], True
+        return value, False
+    if isinstance(value, list):
+        capped = [_cap(item) for item in value]
+        return [item for item, _ in capped], any(cut for _, cut in capped)
+    return value, False
+
+
+def _capped_inputs(inputs: Any) -> tuple:
+    """
+    Copy span inputs with oversized strings truncated; returns (inputs, truncated).
+    
+    Keeps spans from pinning huge prompts in memory until they end, and
+    bounds serialization cost. Inputs that aren't a dict (runnables may pass
+    a plain string or list) are capped as a single value.
+    """
+    if not isinstance(inputs, dict):
+        return _cap(inputs)
+    result = {}
+    truncated = False
+    for key, value in inputs.items():
+        result[key], cut = _cap(value)
+        truncated = truncated or cut
+    return result, truncated
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class _RunState:
+    """Bookkeeping for one in-flight LangChain run."""
+    span: Any
+    start_ns: int
+    token: Any = None
+
+
+# Innermost run started in this context; parents the next run that starts
+_current_run: ContextVar[Optional[_RunState]] = ContextVar("current_langchain_run", default=None)
 
 
 class LangChainCallbackHandler(BaseCallbackHandler):
@@ -34,8 +79,87 @@ class LangChainCallbackHandler(BaseCallbackHandler):
         self.tracer.agent_id = agent_id
         self.tracer.framework = "langchain"
         
-        self._llm_start_times: Dict[str, float] = {}
-        self._spans: Dict[str, Any] = {}
+        self._runs: Dict[str, _RunState] = {}
+        # Runs sampled out, so their descendants are skipped as well
+        self._skipped: set = set()
+    
+    def _sampled(self, run_id: Any, parent_run_id: Any) -> bool:
+        """
+        Decide whether to record a new run.
+        
+        A run inherits its parent run's decision, so a sampled-out run never
+        leaves descendants attached to the wrong ancestor. Only runs without
+        a known parent ask the tracer.
+        """
+        if not self.tracer.enabled:
+            sampled = False
+        elif parent_run_id is not None and parent_run_id in self._runs:
+            sampled = True
+        elif parent_run_id is not None and parent_run_id in self._skipped:
+            sampled = False
+        elif parent_run_id is None and _current_run.get() is not None:
+            sampled = True
+        else:
+            sampled = self.tracer.should_sample()
+        if not sampled:
+            self._skipped.add(run_id)
+        return sampled
+    
+    def _parent_run(self, parent_run_id: Any) -> Optional[_RunState]:
+        """
+        The run a new span nests under.
+        
+        LangChain passes ``parent_run_id`` to every callback; prefer it, since
+        the async callback manager runs sync handlers under a copied context
+        where ``_current_run`` set by the previous callback isn't visible.
+        """
+        if parent_run_id is not None:
+            parent = self._runs.get(parent_run_id)
+            if parent is not None:
+                return parent
+        return _current_run.get()
+    
+    def _start_run(
+        self,
+        run_id: str,
+        parent_run_id: Any,
+        name: str,
+        span_type: SpanType,
+        inputs: Any,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Open a span for a run, nested under its parent run if any.
+        
+        Truncation of oversized inputs is flagged in the span's metadata,
+        where it can't collide with an input name.
+        """
+        inputs, truncated = _capped_inputs(inputs)
+        if truncated:
+            metadata = {**(metadata or {}), "inputs_truncated": True}
+        parent = self._parent_run(parent_run_id)
+        span = self.tracer.start_span(
+            name=name,
+            span_type=span_type,
+            inputs=inputs,
+            metadata=metadata,
+            parent=parent.span if parent is not None else None,
+        )
+        state = _RunState(span=span, start_ns=time.perf_counter_ns())
+        state.token = _current_run.set(state)
+        self._runs[run_id] = state
+    
+    def _finish_run(self, run_id: str) -> Optional[_RunState]:
+        """Forget a run and restore its parent as the current run."""
+        self._skipped.discard(run_id)
+        state = self._runs.pop(run_id, None)
+        if state is not None:
+            try:
+                _current_run.reset(state.token)
+            except ValueError:
+                # Ended in a different context than it started in
+                pass
+        return state
     
     def on_llm_start(
         self,
@@ -45,16 +169,18 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track LLM call start."""
         run_id = kwargs.get("run_id", str(id(prompts)))
-        self._llm_start_times[run_id] = time.time()
+        if not self._sampled(run_id, kwargs.get("parent_run_id")):
+            return
         
         # Start a span for this LLM call
-        span = self.tracer.start_span(
+        self._start_run(
+            run_id,
+            kwargs.get("parent_run_id"),
             name=f"LLM: {serialized.get('name', 'unknown')}",
             span_type=SpanType.LLM_CALL,
             inputs={"prompts": prompts},
             metadata={"model": serialized.get("name", "unknown")},
         )
-        self._spans[run_id] = span
     
     def on_llm_end(
         self,
@@ -63,14 +189,17 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track LLM call completion."""
         run_id = kwargs.get("run_id", "")
-        start_time = self._llm_start_times.pop(run_id, time.time())
-        latency_ms = (time.time() - start_time) * 1000
+        state = self._finish_run(run_id)
+        if state is None:
+            return
+        latency_ms = (time.perf_counter_ns() - state.start_ns) / 1e6
         
         # Extract response text
-        responses = []
-        for generation_list in response.generations:
-            for generation in generation_list:
-                responses.append(generation.text)
+        responses = [
+            generation.text
+            for generation_list in response.generations
+            for generation in generation_list
+        ]
         
         # Get token usage
         tokens = {}
@@ -83,12 +212,19 @@ class LangChainCallbackHandler(BaseCallbackHandler):
             }
         
         # Record LLM call
-        span = self._spans.pop(run_id, None)
-        if span:
-            self.tracer.end_span(
-                span,
-                outputs={"responses": responses, "tokens": tokens},
-            )
+        span = state.span
+        prompts = span.inputs.get("prompts", []) if isinstance(span.inputs, dict) else []
+        span.add_llm_call(LLMCall(
+            model=(span.metadata or {}).get("model", "unknown"),
+            prompt="\n\n".join(prompts),
+            response="\n\n".join(responses),
+            tokens=tokens,
+            latency_ms=latency_ms,
+        ))
+        self.tracer.end_span(
+            span,
+            outputs={"responses": responses, "tokens": tokens},
+        )
     
     def on_llm_error(
         self,
@@ -97,11 +233,9 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track LLM errors."""
         run_id = kwargs.get("run_id", "")
-        self._llm_start_times.pop(run_id, None)
-        
-        span = self._spans.pop(run_id, None)
-        if span:
-            self.tracer.end_span(span, error=error)
+        state = self._finish_run(run_id)
+        if state:
+            self.tracer.end_span(state.span, error=error)
     
     def on_chain_start(
         self,
@@ -111,13 +245,16 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track chain execution start."""
         run_id = kwargs.get("run_id", str(id(inputs)))
+        if not self._sampled(run_id, kwargs.get("parent_run_id")):
+            return
         
-        span = self.tracer.start_span(
+        self._start_run(
+            run_id,
+            kwargs.get("parent_run_id"),
             name=f"Chain: {serialized.get('name', 'unknown')}",
             span_type=SpanType.ORCHESTRATION,
             inputs=inputs,
         )
-        self._spans[run_id] = span
     
     def on_chain_end(
         self,
@@ -126,9 +263,9 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track chain execution end."""
         run_id = kwargs.get("run_id", "")
-        span = self._spans.pop(run_id, None)
-        if span:
-            self.tracer.end_span(span, outputs=outputs)
+        state = self._finish_run(run_id)
+        if state:
+            self.tracer.end_span(state.span, outputs=outputs)
     
     def on_chain_error(
         self,
@@ -137,9 +274,9 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track chain errors."""
         run_id = kwargs.get("run_id", "")
-        span = self._spans.pop(run_id, None)
-        if span:
-            self.tracer.end_span(span, error=error)
+        state = self._finish_run(run_id)
+        if state:
+            self.tracer.end_span(state.span, error=error)
     
     def on_tool_start(
         self,
@@ -149,13 +286,16 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track tool execution start."""
         run_id = kwargs.get("run_id", str(id(input_str)))
+        if not self._sampled(run_id, kwargs.get("parent_run_id")):
+            return
         
-        span = self.tracer.start_span(
+        self._start_run(
+            run_id,
+            kwargs.get("parent_run_id"),
             name=f"Tool: {serialized.get('name', 'unknown')}",
             span_type=SpanType.TOOL_CALL,
             inputs={"input": input_str},
         )
-        self._spans[run_id] = span
     
     def on_tool_end(
         self,
@@ -164,9 +304,9 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track tool execution end."""
         run_id = kwargs.get("run_id", "")
-        span = self._spans.pop(run_id, None)
-        if span:
-            self.tracer.end_span(span, outputs={"output": output})
+        state = self._finish_run(run_id)
+        if state:
+            self.tracer.end_span(state.span, outputs={"output": output})
     
     def on_tool_error(
         self,
@@ -175,9 +315,9 @@ class LangChainCallbackHandler(BaseCallbackHandler):
     ) -> None:
         """Track tool errors."""
         run_id = kwargs.get("run_id", "")
-        span = self._spans.pop(run_id, None)
-        if span:
-            self.tracer.end_span(span, error=error)
+        state = self._finish_run(run_id)
+        if state:
+            self.tracer.end_span(state.span, error=error)
     
     def on_agent_action(
         self,
@@ -185,6 +325,14 @@ class LangChainCallbackHandler(BaseCallbackHandler):
         **kwargs: Any,
     ) -> None:
         """Track agent decisions."""
+        # The action belongs to the agent's own run; follow its decision
+        run_id = kwargs.get("run_id")
+        if run_id in self._skipped or not self.tracer.enabled:
+            return
+        if run_id not in self._runs and not self.tracer.should_sample():
+            return
+        # Nest under the agent's own run when it is known
+        parent = self._runs.get(run_id) or self._parent_run(kwargs.get("parent_run_id"))
         span = self.tracer.start_span(
             name=f"Agent Action: {action.tool}",
             span_type=SpanType.AGENT_DECISION,
@@ -193,8 +341,11 @@ class LangChainCallbackHandler(BaseCallbackHandler):
                 "tool_input": action.tool_input,
                 "log": action.log,
             },
+            parent=parent.span if parent is not None else None,
         )
-        # Will be closed by tool execution
+        # The decision is a point in time: the tool it picks gets its own
+        # span, so close this one right away rather than leave it open
+        self.tracer.end_span(span)
     
     def on_agent_finish(
         self,
@@ -2,11 +2,20 @@
 OpenClaw native integration.
 """
 
+import re
 from typing import Callable
 from ..tracer import observe
 from ..span import SpanType
 
 
+# Function-name patterns, checked in order; the first match decides the span type
+_SPAN_TYPE_PATTERNS = [
+    (re.compile(r"decide|choose|plan|agent"), SpanType.AGENT_DECISION),
+    (re.compile(r"call|invoke|execute|run"), SpanType.ORCHESTRATION),
+    (re.compile(r"tool|function|action"), SpanType.TOOL_CALL),
+]
+
+
 def openclaw_observe(func: Callable) -> Callable:
     """
     Decorator for OpenClaw agent functions.
@@ -21,13 +30,10 @@ def openclaw_observe(func: Callable) -> Callable:
     # Detect function type from name patterns
     func_name = func.__name__.lower()
     
-    if any(keyword in func_name for keyword in ["decide", "choose", "plan", "agent"]):
-        span_type = SpanType.AGENT_DECISION
-    elif any(keyword in func_name for keyword in ["call", "invoke", "execute", "run"]):
-        span_type = SpanType.ORCHESTRATION
-    elif any(keyword in func_name for keyword in ["tool", "function", "action"]):
-        span_type = SpanType.TOOL_CALL
-    else:
-        span_type = SpanType.FUNCTION
+    span_type = SpanType.FUNCTION
+    for pattern, pattern_span_type in _SPAN_TYPE_PATTERNS:
+        if pattern.search(func_name):
+            span_type = pattern_span_type
+            break
     
     return observe(span_type=span_type)(func)
@@ -3,10 +3,37 @@ Span data structures for tracing.
 """
 
 from dataclasses import dataclass, field, asdict
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Any, Optional
-import uuid
+import os
+import reprlib
+import sys
+import time
+
+
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Longest string payload kept on a span; longer inputs are truncated
+_MAX_INPUT_CHARS = 32768
+
+# Bounded repr: builtin containers and strings stop formatting at the limits
+# instead of rendering the whole value and slicing it afterwards
+_REPR = reprlib.Repr()
+_REPR.maxstring = 200
+_REPR.maxother = 200
+_REPR.maxlist = _REPR.maxtuple = _REPR.maxset = _REPR.maxfrozenset = 8
+_REPR.maxdeque = _REPR.maxarray = 8
+_REPR.maxdict = 8
+
+
+def _summarize_object(value: Any) -> dict:
+    """Store type and repr for values that aren't JSON-friendly."""
+    return {
+        "_type": type(value).__name__,
+        "_repr": _REPR.repr(value),
+    }
 
 
 class SpanType(str, Enum):
@@ -27,7 +54,12 @@ class SpanStatus(str, Enum):
     RUNNING = "running"
 
 
-@dataclass
+# Plain interned strings for serialization, avoiding Enum.value lookups per span
+_SPAN_TYPE_STR = {member: sys.intern(member.value) for member in SpanType}
+_SPAN_STATUS_STR = {member: sys.intern(member.value) for member in SpanStatus}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class LLMCall:
     """Details of an LLM API call."""
     model: str
@@ -42,25 +74,26 @@ class LLMCall:
         return asdict(self)
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class Span:
     """A single traced operation."""
-    span_id: str = field(default_factory=lambda: f"span_{uuid.uuid4().hex[:12]}")
+    span_id: str = field(default_factory=lambda: "span_" + os.urandom(6).hex())
     trace_id: Optional[str] = None
     parent_span_id: Optional[str] = None
     name: str = ""
     span_type: SpanType = SpanType.FUNCTION
     status: SpanStatus = SpanStatus.RUNNING
     
-    # Timing
-    start_time: datetime = field(default_factory=datetime.utcnow)
-    end_time: Optional[datetime] = None
-    duration_ms: Optional[float] = None
+    # Timing: wall clock (epoch seconds) for display, perf counter for durations
+    start_wall: float = field(default_factory=time.time)
+    start_ns: int = field(default_factory=time.perf_counter_ns)
+    end_wall: Optional[float] = None
+    duration_ns: Optional[int] = None
     
-    # Data
-    inputs: dict[str, Any] = field(default_factory=dict)
-    outputs: dict[str, Any] = field(default_factory=dict)
-    metadata: dict[str, Any] = field(default_factory=dict)
+    # Data (None rather than a fresh dict when a span carries none)
+    inputs: Optional[dict[str, Any]] = None
+    outputs: Optional[dict[str, Any]] = None
+    metadata: Optional[dict[str, Any]] = None
     
     # LLM-specific
     llm_calls: list[LLMCall] = field(default_factory=list)
@@ -73,10 +106,30 @@ class Span:
     agent_id: Optional[str] = None
     framework: Optional[str] = None
     
+    @property
+    def start_time(self) -> datetime:
+        """Wall-clock start time (UTC)."""
+        return datetime.fromtimestamp(self.start_wall, tz=timezone.utc)
+    
+    @property
+    def duration_ms(self) -> Optional[float]:
+        """Duration in milliseconds, or None while running."""
+        if self.duration_ns is None:
+            return None
+        return self.duration_ns / 1e6
+    
+    @property
+    def end_time(self) -> Optional[datetime]:
+        """Wall-clock end time (UTC), or None while running."""
+        if self.end_wall is None:
+            return None
+        return datetime.fromtimestamp(self.end_wall, tz=timezone.utc)
+    
     def complete(self, outputs: Optional[dict] = None, error: Optional[Exception] = None):
         """Mark span as complete."""
-        self.end_time = datetime.utcnow()
-        self.duration_ms = (self.end_time - self.start_time).total_seconds() * 1000
+        elapsed_ns = time.perf_counter_ns() - self.start_ns
+        self.duration_ns = elapsed_ns
+        self.end_wall = self.start_wall + elapsed_ns / 1e9
         
         if error:
             self.status = SpanStatus.ERROR
@@ -99,14 +152,14 @@ class Span:
             "trace_id": self.trace_id,
             "parent_span_id": self.parent_span_id,
             "name": self.name,
-            "span_type": self.span_type.value,
-            "status": self.status.value,
+            "span_type": _SPAN_TYPE_STR[self.span_type],
+            "status": _SPAN_STATUS_STR[self.status],
             "start_time": self.start_time.isoformat(),
-            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "end_time": self.end_time.isoformat() if self.end_wall is not None else None,
             "duration_ms": self.duration_ms,
-            "inputs": self.inputs,
-            "outputs": self.outputs,
-            "metadata": self.metadata,
+            "inputs": self.inputs if self.inputs is not None else {},
+            "outputs": self.outputs if self.outputs is not None else {},
+            "metadata": self.metadata if self.metadata is not None else {},
             "llm_calls": [call.to_dict() for call in self.llm_calls],
             "error": self.error,
             "error_type": self.error_type,
@@ -2,14 +2,127 @@
 Trace storage backends.
 """
 
+import atexit
 import json
+import mmap
 import os
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from .span import Span
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from .span import Span, _summarize_object
+
+
+# Each trace directory holds one append-only file, one compact JSON span per line
+SPANS_FILE = "spans.ndjson"
+
+# Upper bound on the number of trace directories remembered as existing
+MAX_KNOWN_DIRS = 10000
+
+# Number of most recent traces kept in index.json
+MAX_INDEX_ENTRIES = 1000
+
+
+def _encode_stdlib(data: dict) -> bytes:
+    """Compact UTF-8 JSON via the stdlib, without escaping non-ASCII text."""
+    text = json.dumps(
+        data, ensure_ascii=False, separators=(",", ":"), default=_summarize_object
+    )
+    try:
+        return text.encode("utf-8")
+    except UnicodeEncodeError:
+        # Lone surrogates have no UTF-8 form; fall back to \u escapes
+        return json.dumps(
+            data, separators=(",", ":"), default=_summarize_object
+        ).encode("ascii")
+
+
+def _encode(data: dict) -> bytes:
+    """Encode a document as compact UTF-8 JSON, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. integers wider than 64 bits; the stdlib encoder copes
+            pass
+    return _encode_stdlib(data)
+
+
+def _encode_line(data: dict) -> bytes:
+    """
+    Encode a record as one compact JSON line, using orjson when available.
+    
+    Values neither encoder understands are stored as a type/repr summary.
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(
+                data,
+                default=_summarize_object,
+                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            pass
+    return _encode_stdlib(data) + b"\n"
+
+
+def _stringify_keys(value):
+    """Copy nested dicts and lists, turning keys JSON can't represent into strings."""
+    if isinstance(value, dict):
+        return {
+            k if isinstance(k, (str, int, float, bool)) or k is None else str(k):
+                _stringify_keys(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_stringify_keys(v) for v in value]
+    return value
+
+
+_decode = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+
+def _aggregate_spans(spans: list[dict]) -> dict:
+    """Compute root span, time bounds, total duration and error state in one pass."""
+    root_span = None
+    start_time = end_time = None
+    total_duration_ms = 0
+    has_error = False
+    
+    for s in spans:
+        if root_span is None and s["parent_span_id"] is None:
+            root_span = s
+        started = s["start_time"]
+        if start_time is None or started < start_time:
+            start_time = started
+        ended = s["end_time"]
+        if ended and (end_time is None or ended > end_time):
+            end_time = ended
+        duration = s["duration_ms"]
+        if duration:
+            total_duration_ms += duration
+        if s["status"] == "error":
+            has_error = True
+    
+    return {
+        "root_span": root_span if root_span is not None else spans[0],
+        "start_time": start_time,
+        "end_time": end_time,
+        "total_duration_ms": total_duration_ms,
+        "has_error": has_error,
+    }
 
 
 class TraceStorage(ABC):
@@ -34,87 +147,336 @@ class TraceStorage(ABC):
     def list_traces(self, limit: int = 100) -> list[dict]:
         """List recent traces."""
         pass
+    
+    def flush(self):
+        """Persist any buffered writes (no-op for unbuffered backends)."""
+        pass
+    
+    def close(self):
+        """Flush and release background resources (no-op for unbuffered backends)."""
+        self.flush()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _WriterThread(threading.Thread):
+    """
+    Background thread that drains completed spans and writes them to disk.
+    
+    Keeps filesystem I/O off the traced application's hot path. Spans are
+    handed over through a deque (append/popleft are atomic, so producers take
+    no lock) and an Event that wakes the writer. When the buffer is full the
+    oldest span is dropped and counted in ``lost_spans``; with
+    ``drop_on_full=False`` the submitting thread writes the backlog itself
+    instead. Spans that can't be encoded or written are counted in
+    ``lost_spans`` too. ``periodic`` is invoked roughly every ``period`` seconds for
+    deferred housekeeping.
+    """
+    
+    def __init__(self, write_batch, periodic=None, maxsize: int = 10000,
+                 batch_window: float = 0.05, period: float = 1.0,
+                 drop_on_full: bool = True):
+        super().__init__(name="openclaw-span-writer", daemon=True)
+        self._write_batch = write_batch
+        self._periodic = periodic
+        self.maxsize = maxsize
+        self.batch_window = batch_window
+        self.period = period
+        self.drop_on_full = drop_on_full
+        self.lost_spans = 0
+        
+        self._pending: deque = deque(maxlen=maxsize if drop_on_full else None)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        # Held while a batch is written, so flush() can't overtake the writer
+        self._write_lock = threading.Lock()
+    
+    def submit(self, trace_id: str, span_id: str, span_data: dict):
+        """Queue a serialized span for writing."""
+        pending = self._pending
+        if len(pending) >= self.maxsize:
+            if self.drop_on_full:
+                # deque(maxlen) discards the oldest entry on append
+                self.lost_spans += 1
+            else:
+                self.flush()
+        pending.append((trace_id, span_id, span_data))
+        if self._stopping.is_set():
+            # Writer has stopped: write synchronously
+            self.flush()
+        elif not self._wakeup.is_set():
+            self._wakeup.set()
+    
+    def stop(self):
+        """Stop the thread after it writes what is queued, and wait for it."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
+    
+    def flush(self):
+        """Write every span queued so far before returning."""
+        with self._write_lock:
+            pending = self._pending
+            batch = []
+            while pending:
+                batch.append(pending.popleft())
+            if not batch:
+                return
+            
+            # Group by trace so each trace file is opened once per batch
+            by_trace: dict[str, list] = {}
+            for trace_id, span_id, span_data in batch:
+                by_trace.setdefault(trace_id, []).append((span_id, span_data))
+            try:
+                self._write_batch(by_trace)
+            except Exception:
+                # A failed write must never take the writer thread down;
+                # count the batch as lost rather than dropping it silently
+                self.lost_spans += len(batch)
+    
+    def _run_periodic(self):
+        if self._periodic is None:
+            return
+        try:
+            self._periodic()
+        except Exception:
+            pass
+    
+    def run(self):
+        next_periodic = time.monotonic() + self.period
+        while not self._stopping.is_set():
+            if self._wakeup.wait(timeout=self.period):
+                if self._stopping.is_set():
+                    break
+                # Let a burst accumulate so it is written as one batch
+                self._stopping.wait(self.batch_window)
+                self._wakeup.clear()
+                self.flush()
+            if time.monotonic() >= next_periodic:
+                self._run_periodic()
+                next_periodic = time.monotonic() + self.period
 
 
 class FileStorage(TraceStorage):
-    """Simple file-based storage for traces."""
+    """
+    Simple file-based storage for traces.
+    
+    Each instance runs a background writer thread; call ``close()`` (or use
+    the storage as a context manager) when done with it.
+    """
     
-    def __init__(self, base_dir: Optional[str] = None):
+    def __init__(self, base_dir: Optional[str] = None, drop_on_full: bool = True):
         self.base_dir = Path(base_dir or os.path.expanduser("~/.openclaw/traces"))
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
         # Create index file if doesn't exist
         self.index_file = self.base_dir / "index.json"
         if not self.index_file.exists():
-            self.index_file.write_text(json.dumps({"traces": []}))
+            self.index_file.write_bytes(_encode({"traces": []}))
+        
+        # In-memory copy of the index, newest first. finalize_trace updates it
+        # in O(1); it is written back to index.json by the writer thread
+        # about once a second, on flush() and at exit.
+        self._index_lock = threading.Lock()
+        self._index_dict: dict[str, dict] = {}
+        self._index_order: deque[str] = deque()
+        self._index_dirty = False
+        self._index_mtime_ns: Optional[int] = None
+        with self._index_lock:
+            self._sync_index_from_disk()
+        
+        # Trace directories already created, so mkdir runs once per trace
+        self._known_dirs: dict[str, None] = {}
+        
+        # Span writes happen on a background thread
+        self._writer = _WriterThread(
+            self._write_spans, periodic=self._persist_index, drop_on_full=drop_on_full
+        )
+        self._writer.start()
+        atexit.register(self._flush_at_exit)
+    
+    @property
+    def lost_spans(self) -> int:
+        """Number of spans dropped: queue overflow, or spans that couldn't be encoded or written."""
+        return self._writer.lost_spans
+    
+    def flush(self):
+        """Wait for all pending span writes and index updates to reach disk."""
+        self._writer.flush()
+        self._persist_index()
+    
+    def close(self):
+        """Write everything pending, then stop the writer thread."""
+        atexit.unregister(self._flush_at_exit)
+        self._writer.stop()
+        self._persist_index()
+    
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except OSError:
+            # Storage directory was removed before interpreter shutdown
+            pass
+    
+    def _sync_index_from_disk(self):
+        """
+        Merge in index entries written by other processes (caller holds the lock).
+        
+        Only re-reads index.json when its mtime differs from the last time
+        this instance read or wrote it.
+        """
+        try:
+            mtime_ns = self.index_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime_ns == self._index_mtime_ns:
+            return
+        
+        disk_traces = _decode(self.index_file.read_bytes())["traces"]
+        self._index_mtime_ns = mtime_ns
+        
+        added = [t for t in disk_traces if t["trace_id"] not in self._index_dict]
+        if not added:
+            return
+        for summary in added:
+            self._index_dict[summary["trace_id"]] = summary
+        # Finalize order approximated by end time, newest first
+        ordered = sorted(
+            self._index_dict.values(),
+            key=lambda t: t.get("end_time") or "",
+            reverse=True,
+        )[:MAX_INDEX_ENTRIES]
+        self._index_dict = {t["trace_id"]: t for t in ordered}
+        self._index_order = deque(self._index_dict)
+    
+    def _persist_index(self):
+        """Atomically write the in-memory index to index.json if it changed."""
+        with self._index_lock:
+            if not self._index_dirty:
+                return
+            self._sync_index_from_disk()
+            traces = [self._index_dict[t] for t in self._index_order]
+            
+            with tempfile.NamedTemporaryFile(
+                "wb", dir=self.base_dir, suffix=".tmp", delete=False
+            ) as f:
+                f.write(_encode({"traces": traces}))
+            os.replace(f.name, self.index_file)
+            self._index_mtime_ns = self.index_file.stat().st_mtime_ns
+            self._index_dirty = False
     
     def _get_trace_dir(self, trace_id: str) -> Path:
-        """Get directory for a trace."""
+        """Get directory for a trace, creating it on first use."""
         trace_dir = self.base_dir / trace_id
+        if trace_id in self._known_dirs:
+            return trace_dir
+        
         trace_dir.mkdir(exist_ok=True)
+        self._known_dirs[trace_id] = None
+        if len(self._known_dirs) > MAX_KNOWN_DIRS:
+            # Evict the oldest entry (dicts keep insertion order)
+            self._known_dirs.pop(next(iter(self._known_dirs)), None)
         return trace_dir
     
     def save_span(self, span: Span):
-        """Save a span to a JSON file."""
-        trace_dir = self._get_trace_dir(span.trace_id)
-        span_file = trace_dir / f"{span.span_id}.json"
-        
-        span_data = span.to_dict()
-        with open(span_file, "w") as f:
-            json.dump(span_data, f, indent=2)
+        """Queue a span to be appended to its trace's NDJSON file."""
+        self._writer.submit(span.trace_id, span.span_id, span.to_dict())
     
-    def finalize_trace(self, trace_id: str):
-        """Mark trace as complete and update index."""
+    def _write_spans(self, by_trace: dict[str, list]):
+        """Append a batch of spans to each trace's NDJSON file (runs on the writer thread)."""
+        # Failures are contained per span and per trace, so one bad payload
+        # never costs the rest of the batch
+        for trace_id, spans in by_trace.items():
+            lines = []
+            for _, span_data in spans:
+                try:
+                    lines.append(_encode_line(span_data))
+                except (TypeError, ValueError, RecursionError):
+                    # e.g. tuple dict keys, which both encoders reject
+                    try:
+                        lines.append(_encode_line(_stringify_keys(span_data)))
+                    except Exception:
+                        self._writer.lost_spans += 1
+            if not lines:
+                continue
+            try:
+                with open(self._get_trace_dir(trace_id) / SPANS_FILE, "ab") as f:
+                    f.write(b"".join(lines))
+            except OSError:
+                self._writer.lost_spans += len(lines)
+    
+    def _load_spans(self, trace_id: str) -> list[dict]:
+        """Read every span recorded for a trace."""
         trace_dir = self._get_trace_dir(trace_id)
-        
-        # Load all spans
+        try:
+            with open(trace_dir / SPANS_FILE, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # Empty files can't be mapped
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return [_decode(line) for line in iter(mm.readline, b"") if line.strip()]
+        except FileNotFoundError:
+            return self._load_legacy_spans(trace_dir)
+    
+    def _load_legacy_spans(self, trace_dir: Path) -> list[dict]:
+        """Read traces written before spans.ndjson, which kept one <span_id>.json per span."""
         spans = []
         for span_file in sorted(trace_dir.glob("*.json")):
-            with open(span_file) as f:
-                spans.append(json.load(f))
+            spans.append(_decode(span_file.read_bytes()))
+        return spans
+    
+    def finalize_trace(self, trace_id: str):
+        """Mark trace as complete and update index."""
+        self._writer.flush()
+        spans = self._load_spans(trace_id)
         
         # Create trace summary
         if spans:
-            root_span = next((s for s in spans if s["parent_span_id"] is None), spans[0])
+            stats = _aggregate_spans(spans)
+            root_span = stats["root_span"]
             summary = {
                 "trace_id": trace_id,
                 "name": root_span["name"],
-                "start_time": min(s["start_time"] for s in spans),
-                "end_time": max(s["end_time"] for s in spans if s["end_time"]),
-                "total_duration_ms": sum(s["duration_ms"] or 0 for s in spans),
+                "start_time": stats["start_time"],
+                "end_time": stats["end_time"],
+                "total_duration_ms": stats["total_duration_ms"],
                 "span_count": len(spans),
-                "status": "error" if any(s["status"] == "error" for s in spans) else "success",
+                "status": "error" if stats["has_error"] else "success",
                 "agent_id": root_span.get("agent_id"),
                 "framework": root_span.get("framework"),
             }
             
             # Update index
-            with open(self.index_file, "r+") as f:
-                index = json.load(f)
-                # Remove old entry if exists
-                index["traces"] = [t for t in index["traces"] if t["trace_id"] != trace_id]
-                # Add new entry at beginning
-                index["traces"].insert(0, summary)
-                # Keep only last 1000 traces in index
-                index["traces"] = index["traces"][:1000]
-                f.seek(0)
-                f.truncate()
-                json.dump(index, f, indent=2)
+            with self._index_lock:
+                if trace_id in self._index_dict:
+                    # Re-finalized trace: move it back to the front
+                    self._index_order.remove(trace_id)
+                self._index_dict[trace_id] = summary
+                self._index_order.appendleft(trace_id)
+                while len(self._index_order) > MAX_INDEX_ENTRIES:
+                    self._index_dict.pop(self._index_order.pop(), None)
+                self._index_dirty = True
     
     def get_trace(self, trace_id: str) -> dict:
         """Load a complete trace with all spans."""
-        trace_dir = self._get_trace_dir(trace_id)
-        
-        spans = []
-        for span_file in sorted(trace_dir.glob("*.json")):
-            with open(span_file) as f:
-                spans.append(json.load(f))
+        self._writer.flush()
+        spans = self._load_spans(trace_id)
         
         if not spans:
             return {"trace_id": trace_id, "spans": [], "error": "Trace not found"}
         
+        # Spans are appended as they end; present them in start order (root first on ties)
+        spans.sort(key=lambda s: (s["start_time"], s["parent_span_id"] is not None))
+        
         # Build trace structure
-        root_span = next((s for s in spans if s["parent_span_id"] is None), spans[0])
+        stats = _aggregate_spans(spans)
+        root_span = stats["root_span"]
         
         return {
             "trace_id": trace_id,
@@ -122,14 +484,15 @@ class FileStorage(TraceStorage):
             "spans": spans,
             "metadata": {
                 "span_count": len(spans),
-                "total_duration_ms": sum(s["duration_ms"] or 0 for s in spans),
+                "total_duration_ms": stats["total_duration_ms"],
                 "agent_id": root_span.get("agent_id"),
                 "framework": root_span.get("framework"),
             }
         }
     
     def list_traces(self, limit: int = 100) -> list[dict]:
-        """List recent traces from index."""
-        with open(self.index_file) as f:
-            index = json.load(f)
-            return index["traces"][:limit]
+        """List recent traces from the in-memory index."""
+        with self._index_lock:
+            # Picks up traces finalized by other processes (e.g. when serving the dashboard)
+            self._sync_index_from_disk()
+            return [dict(self._index_dict[t]) for t in islice(self._index_order, limit)]
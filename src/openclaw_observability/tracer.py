@@ -2,48 +2,207 @@
 Core tracing functionality.
 """
 
+import contextlib
 import contextvars
 import functools
 import inspect
-from typing import Any, Callable, Optional
+import math
+import os
+import random
+import sys
+import threading
 import uuid
+from enum import Enum
+from typing import Any, Callable, Optional
 
-from .span import Span, SpanType, LLMCall
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from .span import Span, SpanType, LLMCall, _summarize_object
 from .storage import TraceStorage, FileStorage
 
 
+def _env_enabled(name: str) -> bool:
+    """False only for an explicit 0/false/no/off; anything else, or unset, is on."""
+    return os.getenv(name, "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _env_sample_rate(name: str) -> float:
+    """Sampling rate from the environment, clamped to [0, 1]; 1.0 if missing or invalid."""
+    try:
+        rate = float(os.getenv(name, "1.0"))
+    except ValueError:
+        return 1.0
+    if rate != rate:
+        # NaN
+        return 1.0
+    return min(max(rate, 0.0), 1.0)
+
+
+# Process-wide defaults: OPENCLAW_TRACING=0 turns tracing off,
+# OPENCLAW_SAMPLE=0.1 records roughly 10% of traces
+_ENABLED = _env_enabled("OPENCLAW_TRACING")
+_SAMPLE_RATE = _env_sample_rate("OPENCLAW_SAMPLE")
+
 # Context variable to track current trace
 _current_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
     "current_trace_id", default=None
 )
-_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
-    "current_span", default=None
+# Open spans, innermost last. Immutable tuples make push/pop a cheap copy and
+# keep contexts that share a stack from seeing each other's changes.
+_span_stack: contextvars.ContextVar[tuple] = contextvars.ContextVar(
+    "span_stack", default=()
+)
+_get_span_stack = _span_stack.get
+# Sampling decision covering the current trace (or top-level call), so that
+# spans nested under a sampled-out span are skipped too. None: not decided yet.
+_trace_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar(
+    "trace_sampled", default=None
 )
+_CONTEXT_VARS = (_current_trace_id, _span_stack, _trace_sampled)
+
+
+class _LocalVar:
+    """
+    threading.local stand-in for a ContextVar, used by ``init_tracer(mode="sync")``.
+    
+    Cheaper to read and write than a ContextVar, but state is per thread rather
+    than per context, so it must not be used when spans run under asyncio.
+    The token returned by ``set`` is simply the previous value.
+    """
+    
+    __slots__ = ("_local", "_default")
+    
+    def __init__(self, default):
+        self._local = threading.local()
+        self._default = default
+    
+    def get(self):
+        return getattr(self._local, "value", self._default)
+    
+    def set(self, value):
+        previous = getattr(self._local, "value", self._default)
+        self._local.value = value
+        return previous
+    
+    def reset(self, token):
+        self._local.value = token
+
+
+def _use_context_mode(mode: str):
+    """Rebind the current trace/span-stack/sampling holders for ``mode``."""
+    global _current_trace_id, _span_stack, _get_span_stack, _trace_sampled
+    if mode == "sync":
+        if isinstance(_span_stack, _LocalVar):
+            return
+        _current_trace_id = _LocalVar(None)
+        _span_stack = _LocalVar(())
+        _trace_sampled = _LocalVar(None)
+    elif mode == "context":
+        _current_trace_id, _span_stack, _trace_sampled = _CONTEXT_VARS
+    else:
+        raise ValueError(f"Unknown tracer mode: {mode!r}")
+    _get_span_stack = _span_stack.get
 
 
 class Tracer:
     """Main tracing interface."""
     
+    __slots__ = (
+        "storage", "_agent_id", "_framework", "_make_span", "enabled", "sample_rate"
+    )
+    
     def __init__(self, storage: Optional[TraceStorage] = None, agent_id: Optional[str] = None):
         self.storage = storage or FileStorage()
-        self.agent_id = agent_id
-        self.framework = None
+        self._agent_id = agent_id
+        self._framework = None
+        self._bind_span_factory()
+        self.enabled = _ENABLED
+        self.sample_rate = _SAMPLE_RATE
+    
+    def _bind_span_factory(self):
+        # agent_id/framework are the same for every span this tracer creates,
+        # so bind them once instead of passing them on each call
+        self._make_span = functools.partial(
+            Span, agent_id=self._agent_id, framework=self._framework
+        )
+    
+    @property
+    def agent_id(self) -> Optional[str]:
+        return self._agent_id
+    
+    @agent_id.setter
+    def agent_id(self, value: Optional[str]):
+        self._agent_id = value
+        self._bind_span_factory()
+    
+    @property
+    def framework(self) -> Optional[str]:
+        return self._framework
+    
+    @framework.setter
+    def framework(self, value: Optional[str]):
+        self._framework = value
+        self._bind_span_factory()
+    
+    def _draw(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+    
+    def should_sample(self) -> bool:
+        """
+        Decide whether a span started now should be recorded.
+        
+        Inside a trace this is the decision made once by ``start_trace``, so a
+        trace is recorded whole or not at all. Outside one, a fresh decision
+        is drawn; callers starting a subtree should use ``_decide`` instead so
+        the subtree inherits it.
+        """
+        if not self.enabled:
+            return False
+        sampled = _trace_sampled.get()
+        return self._draw() if sampled is None else sampled
+    
+    def _decide(self) -> tuple:
+        """
+        Return ``(sampled, token)`` for a call that may start a subtree.
+        
+        ``token`` is set when no decision was in effect: this call made it for
+        everything nested under it, and must reset ``_trace_sampled`` with the
+        token when it returns.
+        """
+        if not self.enabled:
+            return False, None
+        sampled = _trace_sampled.get()
+        if sampled is not None:
+            return sampled, None
+        sampled = self._draw()
+        return sampled, _trace_sampled.set(sampled)
     
     def start_trace(self, name: str = "root", metadata: Optional[dict] = None) -> str:
-        """Start a new trace."""
-        trace_id = f"tr_{uuid.uuid4().hex[:12]}"
+        """
+        Start a new trace.
+        
+        The sampling decision for the whole trace is made here; a sampled-out
+        trace records no spans and is not added to the index.
+        """
+        _trace_sampled.set(self._draw())
+        return self._open_trace(name, metadata)
+    
+    def _open_trace(self, name: str, metadata: Optional[dict] = None) -> str:
+        trace_id = "tr_" + os.urandom(6).hex()
         _current_trace_id.set(trace_id)
         
         # Create root span
-        root_span = Span(
+        root_span = self._make_span(
             trace_id=trace_id,
             name=name,
             span_type=SpanType.ORCHESTRATION,
-            agent_id=self.agent_id,
-            framework=self.framework,
-            metadata=metadata or {},
+            metadata=metadata,
         )
-        _current_span.set(root_span)
+        _span_stack.set((root_span,))
         
         return trace_id
     
@@ -53,46 +212,99 @@ class Tracer:
         span_type: SpanType = SpanType.FUNCTION,
         inputs: Optional[dict] = None,
         metadata: Optional[dict] = None,
+        parent: Optional[Span] = None,
     ) -> Span:
-        """Start a new span within the current trace."""
-        trace_id = _current_trace_id.get()
-        if not trace_id:
-            trace_id = self.start_trace(name="auto_trace")
+        """
+        Start a new span within the current trace.
         
-        parent_span = _current_span.get()
+        ``parent`` overrides the context's current span, for integrations
+        that track their own run hierarchy.
+        """
+        return self._start_span(name, span_type, inputs, metadata, parent)[0]
+    
+    def _start_span(
+        self,
+        name: str,
+        span_type: SpanType = SpanType.FUNCTION,
+        inputs: Optional[dict] = None,
+        metadata: Optional[dict] = None,
+        parent: Optional[Span] = None,
+    ) -> tuple:
+        """Start a span; also return the token that undoes pushing it."""
+        stack = _span_stack.get()
+        if parent is not None:
+            trace_id = parent.trace_id
+            parent_span = parent
+        else:
+            trace_id = _current_trace_id.get()
+            if not trace_id:
+                trace_id = self._open_trace(name="auto_trace")
+                stack = _span_stack.get()
+            parent_span = stack[-1] if stack else None
         
-        span = Span(
+        span = self._make_span(
             trace_id=trace_id,
             parent_span_id=parent_span.span_id if parent_span else None,
             name=name,
             span_type=span_type,
-            inputs=inputs or {},
-            metadata=metadata or {},
-            agent_id=self.agent_id,
-            framework=self.framework,
+            inputs=inputs,
+            metadata=metadata,
         )
         
-        _current_span.set(span)
-        return span
+        token = _span_stack.set(stack + (span,))
+        return span, token
     
-    def end_span(self, span: Span, outputs: Optional[dict] = None, error: Optional[Exception] = None):
-        """End the current span."""
+    def end_span(
+        self,
+        span: Span,
+        outputs: Optional[dict] = None,
+        error: Optional[Exception] = None,
+        token: Optional[Any] = None,
+    ):
+        """
+        End the current span.
+        
+        ``token`` (from ``_start_span``) restores the parent span directly
+        instead of reading and rebuilding the span stack.
+        """
         span.complete(outputs=outputs, error=error)
         self.storage.save_span(span)
         
         # Restore parent span as current
-        if span.parent_span_id:
-            # In a real implementation, we'd maintain a span stack
-            # For MVP, just clear current span
-            _current_span.set(None)
+        if token is not None:
+            try:
+                _span_stack.reset(token)
+                return
+            except (ValueError, RuntimeError):
+                # Token from another context, or already used
+                pass
+        stack = _span_stack.get()
+        if stack and stack[-1] is span:
+            _span_stack.set(stack[:-1])
+        elif span in stack:
+            # Ended out of order (e.g. interleaved callbacks)
+            _span_stack.set(tuple(s for s in stack if s is not span))
+    
+    def flush(self):
+        """Block until every ended span has been handed to storage."""
+        self.storage.flush()
     
     def end_trace(self):
         """End the current trace."""
         trace_id = _current_trace_id.get()
         if trace_id:
-            self.storage.finalize_trace(trace_id)
+            if _trace_sampled.get() is not False:
+                # Close the root span opened by start_trace
+                stack = _span_stack.get()
+                if stack and stack[0].trace_id == trace_id and stack[0].parent_span_id is None:
+                    root_span = stack[0]
+                    root_span.complete()
+                    self.storage.save_span(root_span)
+                
+                self.storage.finalize_trace(trace_id)
             _current_trace_id.set(None)
-            _current_span.set(None)
+            _span_stack.set(())
+            _trace_sampled.set(None)
     
     def add_llm_call(
         self,
@@ -104,26 +316,44 @@ class Tracer:
         cost: Optional[float] = None,
     ):
         """Record an LLM API call in the current span."""
-        span = _current_span.get()
-        if span:
-            llm_call = LLMCall(
-                model=model,
-                prompt=prompt,
-                response=response,
-                tokens=tokens,
-                latency_ms=latency_ms,
-                cost=cost,
-            )
-            span.add_llm_call(llm_call)
+        stack = _get_span_stack()
+        if not stack:
+            return
+        
+        # Model names repeat across calls; share one string object
+        if type(model) is str:
+            model = sys.intern(model)
+        
+        llm_call = LLMCall(
+            model=model,
+            prompt=prompt,
+            response=response,
+            tokens=tokens,
+            latency_ms=latency_ms,
+            cost=cost,
+        )
+        stack[-1].add_llm_call(llm_call)
 
 
 # Global tracer instance
 _global_tracer: Optional[Tracer] = None
 
 
-def init_tracer(storage: Optional[TraceStorage] = None, agent_id: Optional[str] = None) -> Tracer:
-    """Initialize the global tracer."""
+def init_tracer(
+    storage: Optional[TraceStorage] = None,
+    agent_id: Optional[str] = None,
+    mode: str = "context",
+) -> Tracer:
+    """
+    Initialize the global tracer.
+    
+    ``mode="context"`` (the default) tracks the current trace and span with
+    ContextVars, which is correct under asyncio. ``mode="sync"`` uses
+    threading.local instead, which is faster for agents that never run traced
+    code in coroutines. Switch modes before any trace is open.
+    """
     global _global_tracer
+    _use_context_mode(mode)
     _global_tracer = Tracer(storage=storage, agent_id=agent_id)
     return _global_tracer
 
@@ -146,56 +376,249 @@ def observe(
     span_type: SpanType = SpanType.FUNCTION,
     capture_args: bool = True,
     capture_result: bool = True,
+    lean: bool = False,
 ):
     """
     Decorator to automatically trace a function.
     
+    With OPENCLAW_TRACING=0 the function is returned undecorated. At runtime,
+    calls skip tracing while ``tracer.enabled`` is False and are sampled at
+    ``tracer.sample_rate``.
+    
+    ``lean=True`` copies only ``__name__``, ``__qualname__`` and ``__wrapped__``
+    onto the wrapper instead of everything ``functools.wraps`` copies (docstring,
+    module, annotations, ``__dict__``), making decoration cheaper.
+    
     Usage:
         @observe(span_type=SpanType.AGENT_DECISION)
         def choose_action(state):
             return action
     """
     def decorator(func: Callable) -> Callable:
+        if not _ENABLED:
+            # Tracing is off for this process: leave the function untouched
+            return func
+        
         func_name = name or func.__name__
+        bind_inputs = _make_input_binder(func) if capture_args else None
         
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            tracer = get_tracer()
-            
-            # Capture inputs
-            inputs = {}
-            if capture_args:
-                sig = inspect.signature(func)
-                bound = sig.bind(*args, **kwargs)
-                bound.apply_defaults()
-                inputs = {k: _serialize_value(v) for k, v in bound.arguments.items()}
-            
-            # Start span
-            span = tracer.start_span(
-                name=func_name,
-                span_type=span_type,
-                inputs=inputs,
+        if inspect.iscoroutinefunction(func):
+            wrapper = _make_async_wrapper(
+                func, func_name, span_type, bind_inputs, capture_result
             )
-            
+        else:
+            # Zero-parameter functions have no binder and take the no-args path
+            make_wrapper = _WRAPPER_FACTORIES[bind_inputs is not None, bool(capture_result)]
+            wrapper = make_wrapper(func, func_name, span_type, bind_inputs)
+        if lean:
+            wrapper.__name__ = func.__name__
+            wrapper.__qualname__ = func.__qualname__
+            wrapper.__wrapped__ = func
+            return wrapper
+        return functools.wraps(func)(wrapper)
+    return decorator
+
+
+# One wrapper factory per (capture_args, capture_result) combination, so each
+# wrapper only does the capture work it was configured for. Wrappers read
+# _global_tracer directly and only call get_tracer() before it exists; this
+# always sees the latest init_tracer() without any cache to invalidate.
+# Sampling follows the enclosing trace; a call made outside any trace decides
+# for its whole subtree, so nested calls are never recorded without it.
+
+def _wrap_none(func: Callable, name: str, span_type: SpanType, bind_inputs) -> Callable:
+    def wrapper(*args, **kwargs):
+        tracer = _global_tracer or get_tracer()
+        sampled, scope = tracer._decide()
+        if scope is not None:
+            # Outermost traced call: run again with the decision in effect
             try:
-                result = func(*args, **kwargs)
-                
-                # Capture outputs
-                outputs = {}
-                if capture_result:
-                    outputs = {"result": _serialize_value(result)}
-                
-                tracer.end_span(span, outputs=outputs)
-                return result
-                
-            except Exception as e:
-                tracer.end_span(span, error=e)
-                raise
+                return wrapper(*args, **kwargs)
+            finally:
+                _trace_sampled.reset(scope)
+        if not sampled:
+            return func(*args, **kwargs)
+        span, token = tracer._start_span(name, span_type)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            tracer.end_span(span, error=e, token=token)
+            raise
+        tracer.end_span(span, token=token)
+        return result
+    return wrapper
+
+
+def _wrap_args_only(func: Callable, name: str, span_type: SpanType, bind_inputs) -> Callable:
+    def wrapper(*args, **kwargs):
+        tracer = _global_tracer or get_tracer()
+        sampled, scope = tracer._decide()
+        if scope is not None:
+            # Outermost traced call: run again with the decision in effect
+            try:
+                return wrapper(*args, **kwargs)
+            finally:
+                _trace_sampled.reset(scope)
+        if not sampled:
+            return func(*args, **kwargs)
+        inputs = _serialize_arguments(bind_inputs(args, kwargs))
+        span, token = tracer._start_span(name, span_type, inputs)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            tracer.end_span(span, error=e, token=token)
+            raise
+        tracer.end_span(span, token=token)
+        return result
+    return wrapper
+
+
+def _wrap_result_only(func: Callable, name: str, span_type: SpanType, bind_inputs) -> Callable:
+    def wrapper(*args, **kwargs):
+        tracer = _global_tracer or get_tracer()
+        sampled, scope = tracer._decide()
+        if scope is not None:
+            # Outermost traced call: run again with the decision in effect
+            try:
+                return wrapper(*args, **kwargs)
+            finally:
+                _trace_sampled.reset(scope)
+        if not sampled:
+            return func(*args, **kwargs)
+        span, token = tracer._start_span(name, span_type)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            tracer.end_span(span, error=e, token=token)
+            raise
+        if type(result) in _PRIMITIVE_TYPES:
+            outputs = {"result": result}
+        else:
+            outputs = {"result": _serialize_value(result)}
+        tracer.end_span(span, outputs=outputs, token=token)
+        return result
+    return wrapper
+
+
+def _wrap_both(func: Callable, name: str, span_type: SpanType, bind_inputs) -> Callable:
+    def wrapper(*args, **kwargs):
+        tracer = _global_tracer or get_tracer()
+        sampled, scope = tracer._decide()
+        if scope is not None:
+            # Outermost traced call: run again with the decision in effect
+            try:
+                return wrapper(*args, **kwargs)
+            finally:
+                _trace_sampled.reset(scope)
+        if not sampled:
+            return func(*args, **kwargs)
+        inputs = _serialize_arguments(bind_inputs(args, kwargs))
+        span, token = tracer._start_span(name, span_type, inputs)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            tracer.end_span(span, error=e, token=token)
+            raise
+        if type(result) in _PRIMITIVE_TYPES:
+            outputs = {"result": result}
+        else:
+            outputs = {"result": _serialize_value(result)}
+        tracer.end_span(span, outputs=outputs, token=token)
+        return result
+    return wrapper
+
+
+_WRAPPER_FACTORIES = {
+    (False, False): _wrap_none,
+    (True, False): _wrap_args_only,
+    (False, True): _wrap_result_only,
+    (True, True): _wrap_both,
+}
+
+
+def _make_async_wrapper(
+    func: Callable, name: str, span_type: SpanType, bind_inputs, capture_result: bool
+) -> Callable:
+    """Wrap a coroutine function; the span stays open until the awaited call finishes."""
+    async def wrapper(*args, **kwargs):
+        tracer = _global_tracer or get_tracer()
+        sampled, scope = tracer._decide()
+        if scope is not None:
+            # Outermost traced call: run again with the decision in effect
+            try:
+                return await wrapper(*args, **kwargs)
+            finally:
+                _trace_sampled.reset(scope)
+        if not sampled:
+            return await func(*args, **kwargs)
+        inputs = _serialize_arguments(bind_inputs(args, kwargs)) if bind_inputs else None
+        span, token = tracer._start_span(name, span_type, inputs)
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            tracer.end_span(span, error=e, token=token)
+            raise
+        outputs = None
+        if capture_result:
+            if type(result) in _PRIMITIVE_TYPES:
+                outputs = {"result": result}
+            else:
+                outputs = {"result": _serialize_value(result)}
+        tracer.end_span(span, outputs=outputs, token=token)
+        return result
+    return wrapper
+
+
+def _make_input_binder(func: Callable) -> Optional[Callable[[tuple, dict], dict]]:
+    """
+    Build a function mapping call arguments to ``{parameter: value}``.
+    
+    Equivalent to ``Signature.bind`` + ``apply_defaults``, but the signature is
+    inspected once, and calls that fill every parameter of a plain function
+    skip binding altogether. Returns None for functions without parameters,
+    which have no inputs to capture.
+    """
+    sig = inspect.signature(func)
+    param_names = tuple(sig.parameters)
+    if not param_names:
+        return None
+    param_set = frozenset(param_names)
+    n_params = len(param_names)
+    simple = all(
+        p.kind is inspect.Parameter.POSITIONAL_OR_KEYWORD for p in sig.parameters.values()
+    )
+    
+    def bind_inputs(args: tuple, kwargs: dict) -> dict:
+        if simple and len(args) + len(kwargs) == n_params:
+            arguments = dict(zip(param_names, args))
+            if not kwargs:
+                return arguments
+            arguments.update(kwargs)
+            if arguments.keys() == param_set:
+                return arguments
         
-        return wrapper
-    return decorator
+        # Defaults, *args/**kwargs or a bad call: let bind sort it out (and raise)
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound.arguments
+    
+    return bind_inputs
 
 
+def _serialize_arguments(arguments: dict) -> dict:
+    """
+    Serialize bound call arguments.
+    
+    ``arguments`` is freshly built per call, so when every value is already a
+    primitive it is returned as-is instead of being copied.
+    """
+    for value in arguments.values():
+        if type(value) not in _PRIMITIVE_TYPES:
+            return {k: _serialize_value(v) for k, v in arguments.items()}
+    return arguments
+
+
+@contextlib.contextmanager
 def trace(name: str = "trace"):
     """
     Context manager for manual tracing.
@@ -205,32 +628,124 @@ def trace(name: str = "trace"):
             # code here
             pass
     """
-    class TraceContext:
-        def __enter__(self):
-            self.tracer = get_tracer()
-            self.trace_id = self.tracer.start_trace(name)
-            return self.trace_id
-        
-        def __exit__(self, exc_type, exc_val, exc_tb):
-            self.tracer.end_trace()
-    
-    return TraceContext()
+    tracer = get_tracer()
+    trace_id = tracer.start_trace(name)
+    try:
+        yield trace_id
+    finally:
+        tracer.end_trace()
+
+
+# Exact types stored as-is; subclasses are handled by the isinstance fallbacks
+_PRIMITIVE_TYPES = frozenset({int, float, str, bool, type(None)})
+
+# Containers nested deeper than this are stored as a type/repr summary. It is
+# orjson's own nesting limit, so values that orjson encodes are kept whole by
+# the Python walk too, and deeper ones are cut at the same place either way.
+_MAX_SERIALIZE_DEPTH = 255
+
+# Stack marker used by _serialize_value to take a container off the current path
+_EXIT = object()
+
+
+def _snapshot_default(value: Any) -> Any:
+    """orjson ``default`` hook: keep float and tuple subclasses as values, summarize the rest."""
+    if isinstance(value, float):
+        # e.g. numpy.float64 scores
+        return float(value)
+    if isinstance(value, tuple):
+        # e.g. namedtuples
+        return list(value)
+    return _summarize_object(value)
+
+
+if ORJSON_AVAILABLE:
+    # Dataclasses and datetimes go through _snapshot_default like any other
+    # non-JSON value. orjson has no passthrough for enums and UUIDs, so the
+    # Python walk below stores those the way orjson does (value / string),
+    # and turns NaN/infinity into None as orjson does.
+    _ORJSON_SNAPSHOT_OPTIONS = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
 
 
 def _serialize_value(value: Any) -> Any:
     """Serialize a value for storage."""
     # Handle common types
-    if value is None or isinstance(value, (int, float, str, bool)):
+    if type(value) in _PRIMITIVE_TYPES:
         return value
     
-    if isinstance(value, (list, tuple)):
-        return [_serialize_value(v) for v in value]
+    if ORJSON_AVAILABLE:
+        # Encode + decode in C: yields a detached JSON-safe copy in one pass
+        try:
+            return orjson.loads(
+                orjson.dumps(value, default=_snapshot_default, option=_ORJSON_SNAPSHOT_OPTIONS)
+            )
+        except TypeError:
+            # Non-str keys, ints wider than 64 bits, cycles, very deep
+            # nesting: take the Python path, which handles all of them
+            pass
     
-    if isinstance(value, dict):
-        return {k: _serialize_value(v) for k, v in value.items()}
+    # Walk nested containers with an explicit stack instead of recursion.
+    # Containers are copied first, then non-primitive slots are filled in.
+    # Types are mapped the way orjson maps them, so both paths agree.
+    holder = [None]
+    stack = [(holder, 0, value, 0)]
+    # ids of the containers on the current path; an _EXIT entry is popped
+    # once a container's children are done and takes it off the path
+    active = set()
+    while stack:
+        target, key, item, depth = stack.pop()
+        if target is _EXIT:
+            active.discard(item)
+            continue
+        item_type = type(item)
+        
+        if item_type is list or item_type is tuple:
+            out = list(item)
+            slots = enumerate(out)
+        elif item_type is dict:
+            out = dict(item)
+            slots = out.items()
+        elif isinstance(item, Enum):
+            # Stored as its value
+            stack.append((target, key, item.value, depth))
+            continue
+        elif isinstance(item, uuid.UUID):
+            target[key] = str(item)
+            continue
+        elif isinstance(item, str):
+            target[key] = str.__str__(item)
+            continue
+        elif isinstance(item, int):
+            target[key] = int.__int__(item)
+            continue
+        elif isinstance(item, float):
+            number = float(item)
+            target[key] = number if math.isfinite(number) else None
+            continue
+        elif isinstance(item, (list, tuple)):
+            out = list(item)
+            slots = enumerate(out)
+        elif isinstance(item, dict):
+            out = dict(item)
+            slots = out.items()
+        else:
+            target[key] = _summarize_object(item)
+            continue
+        
+        item_id = id(item)
+        if depth >= _MAX_SERIALIZE_DEPTH or item_id in active:
+            target[key] = _summarize_object(item)
+            continue
+        
+        target[key] = out
+        active.add(item_id)
+        stack.append((_EXIT, None, item_id, depth))
+        for slot, child in slots:
+            child_type = type(child)
+            if child_type is float:
+                if not math.isfinite(child):
+                    out[slot] = None
+            elif child_type not in _PRIMITIVE_TYPES:
+                stack.append((out, slot, child, depth + 1))
     
-    # For complex objects, store type and repr
-    return {
-        "_type": type(value).__name__,
-        "_repr": repr(value)[:200],  # Truncate long reprs
-    }
+    return holder[0]
@@ -0,0 +1,31 @@
+"""
+Shared test setup.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+import tempfile
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from openclaw_observability import FileStorage
+from openclaw_observability import tracer as tracer_module
+
+
+@pytest.fixture
+def temp_storage():
+    """Create temporary storage for tests."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = FileStorage(base_dir=tmpdir)
+        yield storage
+        storage.close()
+
+
+@pytest.fixture(autouse=True)
+def clean_trace_context():
+    """Drop any trace a test left open, so it can't leak into the next test."""
+    yield
+    tracer_module._current_trace_id.set(None)
+    tracer_module._span_stack.set(())
+    tracer_module._trace_sampled.set(None)
@@ -0,0 +1,144 @@
+"""
+Tests for the LangChain callback handler.
+
+The handler's callbacks are plain methods, so they are driven directly
+without LangChain installed.
+"""
+
+import contextvars
+import pytest
+import random
+from types import SimpleNamespace
+
+from openclaw_observability import (
+    observe, trace, init_tracer, get_current_trace, SpanType
+)
+from openclaw_observability.integrations import LangChainCallbackHandler
+from openclaw_observability.span import _MAX_INPUT_CHARS
+
+
+def test_agent_actions_are_closed(temp_storage):
+    """Test that agent action spans don't stay open as parents."""
+    init_tracer(storage=temp_storage)
+    handler = LangChainCallbackHandler(agent_id="lc-agent")
+
+    @observe()
+    def after_chain():
+        return "done"
+
+    with trace("agent_run") as trace_id:
+        handler.on_chain_start({"name": "executor"}, {"input": "q"}, run_id="chain")
+        handler.on_agent_action(
+            SimpleNamespace(tool="search", tool_input="q", log=""), run_id="chain"
+        )
+        handler.on_tool_start({"name": "search"}, "q", run_id="tool")
+        handler.on_tool_end("result", run_id="tool")
+        handler.on_agent_action(
+            SimpleNamespace(tool="calc", tool_input="1+1", log=""), run_id="chain"
+        )
+        handler.on_chain_end({"output": "2"}, run_id="chain")
+        after_chain()
+
+    spans = {s["name"]: s for s in temp_storage.get_trace(trace_id)["spans"]}
+    chain = spans["Chain: executor"]
+    for name in ("Agent Action: search", "Agent Action: calc", "Tool: search"):
+        assert spans[name]["parent_span_id"] == chain["span_id"]
+        assert spans[name]["status"] == "success"
+    assert spans["Agent Action: calc"]["span_type"] == SpanType.AGENT_DECISION.value
+    assert spans["after_chain"]["parent_span_id"] == spans["agent_run"]["span_id"]
+
+
+def test_chain_inputs_capped(temp_storage):
+    """Test truncation of oversized inputs, including non-dict inputs."""
+    init_tracer(storage=temp_storage)
+    handler = LangChainCallbackHandler()
+    long_text = "x" * (_MAX_INPUT_CHARS + 10)
+
+    with trace("capped") as trace_id:
+        handler.on_chain_start(
+            {"name": "dict"}, {"text": long_text, "truncated": "user value"}, run_id="a"
+        )
+        handler.on_chain_end({}, run_id="a")
+        handler.on_chain_start({"name": "str"}, long_text, run_id="b")
+        handler.on_chain_end({}, run_id="b")
+        handler.on_chain_start({"name": "short"}, "hello", run_id="c")
+        handler.on_chain_end({}, run_id="c")
+
+    spans = {s["name"]: s for s in temp_storage.get_trace(trace_id)["spans"]}
+    dict_span = spans["Chain: dict"]
+    assert len(dict_span["inputs"]["text"]) == _MAX_INPUT_CHARS
+    assert dict_span["inputs"]["truncated"] == "user value"
+    assert dict_span["metadata"]["inputs_truncated"] is True
+    assert len(spans["Chain: str"]["inputs"]) == _MAX_INPUT_CHARS
+    assert spans["Chain: str"]["metadata"]["inputs_truncated"] is True
+    assert spans["Chain: short"]["inputs"] == "hello"
+    assert spans["Chain: short"]["metadata"] == {}
+
+
+def test_sampled_out_runs_skip_descendants(temp_storage):
+    """Test that child runs follow their parent run's sampling decision."""
+    tracer = init_tracer(storage=temp_storage)
+    tracer.sample_rate = 0.5
+    handler = LangChainCallbackHandler()
+    random.seed(7)
+
+    for i in range(30):
+        handler.on_chain_start({"name": f"c{i}"}, {}, run_id=f"c{i}")
+        handler.on_tool_start({"name": f"t{i}"}, "", run_id=f"t{i}", parent_run_id=f"c{i}")
+        handler.on_tool_end("", run_id=f"t{i}", parent_run_id=f"c{i}")
+        handler.on_chain_end({}, run_id=f"c{i}")
+    trace_id = get_current_trace()
+    tracer.end_trace()
+
+    spans = temp_storage.get_trace(trace_id)["spans"]
+    names = {s["name"] for s in spans}
+    recorded = [i for i in range(30) if f"Chain: c{i}" in names]
+    assert 0 < len(recorded) < 30
+    for i in range(30):
+        assert (f"Tool: t{i}" in names) == (i in recorded)
+    span_ids = {s["span_id"] for s in spans}
+    assert all(s["parent_span_id"] in span_ids for s in spans if s["parent_span_id"])
+    assert not handler._skipped
+
+
+def test_parent_run_id_across_contexts(temp_storage):
+    """Test nesting when each callback runs in its own copied context."""
+    init_tracer(storage=temp_storage)
+    handler = LangChainCallbackHandler()
+
+    def call(callback, *args, **kwargs):
+        # What LangChain's async callback manager does for sync handlers
+        contextvars.copy_context().run(callback, *args, **kwargs)
+
+    with trace("async_run") as trace_id:
+        call(handler.on_chain_start, {"name": "outer"}, {}, run_id="outer")
+        call(handler.on_chain_start, {"name": "inner"}, {}, run_id="inner", parent_run_id="outer")
+        call(handler.on_tool_start, {"name": "search"}, "q", run_id="tool", parent_run_id="inner")
+        call(handler.on_tool_end, "r", run_id="tool", parent_run_id="inner")
+        call(handler.on_chain_end, {}, run_id="inner", parent_run_id="outer")
+        call(handler.on_chain_end, {}, run_id="outer")
+
+    spans = {s["name"]: s for s in temp_storage.get_trace(trace_id)["spans"]}
+    assert spans["Chain: inner"]["parent_span_id"] == spans["Chain: outer"]["span_id"]
+    assert spans["Tool: search"]["parent_span_id"] == spans["Chain: inner"]["span_id"]
+
+
+def test_llm_call_recorded(temp_storage):
+    """Test that an LLM run records its call details and latency."""
+    init_tracer(storage=temp_storage)
+    handler = LangChainCallbackHandler()
+    response = SimpleNamespace(
+        generations=[[SimpleNamespace(text="hi there")]],
+        llm_output={"token_usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}},
+    )
+
+    with trace("llm") as trace_id:
+        handler.on_llm_start({"name": "gpt-4"}, ["hello"], run_id="llm")
+        handler.on_llm_end(response, run_id="llm")
+
+    spans = {s["name"]: s for s in temp_storage.get_trace(trace_id)["spans"]}
+    (call,) = spans["LLM: gpt-4"]["llm_calls"]
+    assert call["model"] == "gpt-4"
+    assert (call["prompt"], call["response"]) == ("hello", "hi there")
+    assert call["tokens"] == {"input": 3, "output": 2, "total": 5}
+    assert call["latency_ms"] >= 0
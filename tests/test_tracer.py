@@ -2,26 +2,23 @@
 Tests for core tracing functionality.
 """
 
+import asyncio
+import copy
+import dataclasses
+import inspect
+import pickle
 import pytest
+import random
 import time
-from pathlib import Path
-import sys
 import tempfile
+import threading
 import json
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from openclaw_observability import (
-    Tracer, observe, trace, init_tracer,
-    FileStorage, SpanType, SpanStatus
+    Tracer, observe, trace, init_tracer, get_current_trace,
+    FileStorage, Span, SpanType, SpanStatus
 )
-
-
-@pytest.fixture
-def temp_storage():
-    """Create temporary storage for tests."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield FileStorage(base_dir=tmpdir)
+from openclaw_observability.storage import _WriterThread
 
 
 def test_basic_trace(temp_storage):
@@ -50,6 +47,34 @@ def test_span_creation(temp_storage):
     assert span.duration_ms is not None
 
 
+def test_span_without_payloads_copies(temp_storage):
+    """Test that spans without inputs/outputs pickle, copy and serialize."""
+    tracer = Tracer(storage=temp_storage)
+    tracer.start_trace("copies")
+    span = tracer.start_span("bare")
+    tracer.end_span(span)
+    
+    assert pickle.loads(pickle.dumps(span)).span_id == span.span_id
+    assert copy.deepcopy(span).name == "bare"
+    assert dataclasses.asdict(span)["inputs"] is None
+    data = span.to_dict()
+    assert data["inputs"] == data["outputs"] == data["metadata"] == {}
+
+
+def test_tracer_identity_updates_spans(temp_storage):
+    """Test that agent_id/framework set after construction reach new spans."""
+    tracer = Tracer(storage=temp_storage, agent_id="first")
+    tracer.start_trace("identity")
+    before = tracer.start_span("before")
+    
+    tracer.agent_id = "second"
+    tracer.framework = "langchain"
+    after = tracer.start_span("after")
+    
+    assert (before.agent_id, before.framework) == ("first", None)
+    assert (after.agent_id, after.framework) == ("second", "langchain")
+
+
 def test_observe_decorator(temp_storage):
     """Test @observe decorator."""
     tracer = init_tracer(storage=temp_storage)
@@ -68,6 +93,22 @@ def test_observe_decorator(temp_storage):
     assert traces[0]["name"] == "math_test"
 
 
+def test_observe_lean(temp_storage):
+    """Test that lean mode copies only the name attributes."""
+    init_tracer(storage=temp_storage)
+    
+    def double(x):
+        """Double x."""
+        return x * 2
+    
+    wrapped = observe(lean=True)(double)
+    assert wrapped.__name__ == "double"
+    assert wrapped.__qualname__ == double.__qualname__
+    assert wrapped.__wrapped__ is double
+    assert wrapped.__doc__ is None
+    assert wrapped(2) == 4
+
+
 def test_error_handling(temp_storage):
     """Test error capture."""
     tracer = init_tracer(storage=temp_storage)
@@ -157,5 +198,402 @@ def test_nested_spans(temp_storage):
     assert len(trace_data["spans"]) >= 2
 
 
+def test_observe_async_function(temp_storage):
+    """Test @observe on a coroutine function."""
+    tracer = init_tracer(storage=temp_storage)
+    
+    @observe()
+    async def fetch(x):
+        await asyncio.sleep(0)
+        return x * 2
+    
+    assert inspect.iscoroutinefunction(fetch)
+    trace_id = tracer.start_trace("async_test")
+    assert asyncio.run(fetch(21)) == 42
+    tracer.end_trace()
+    
+    temp_storage.flush()
+    spans = temp_storage.get_trace(trace_id)["spans"]
+    fetch_span = next(s for s in spans if s["name"] == "fetch")
+    assert fetch_span["inputs"] == {"x": 21}
+    assert fetch_span["outputs"] == {"result": 42}
+
+
+def test_sync_mode_nested_spans(temp_storage):
+    """Test span nesting with threading.local context tracking."""
+    tracer = init_tracer(storage=temp_storage, mode="sync")
+    try:
+        @observe()
+        def inner():
+            return "inner"
+        
+        @observe()
+        def outer():
+            return inner()
+        
+        with trace("sync_test"):
+            outer()
+            trace_id = get_current_trace()
+        assert get_current_trace() is None
+        
+        temp_storage.flush()
+        spans = {s["name"]: s for s in temp_storage.get_trace(trace_id)["spans"]}
+        assert spans["inner"]["parent_span_id"] == spans["outer"]["span_id"]
+    finally:
+        init_tracer(storage=temp_storage)
+
+
+def test_span_stack_restores_parent(temp_storage):
+    """Test that ending a child span makes its parent current again."""
+    tracer = init_tracer(storage=temp_storage)
+    
+    @observe()
+    def child():
+        return "child"
+    
+    @observe()
+    def parent():
+        child()
+        child()
+        return "parent"
+    
+    with trace("stack_test") as trace_id:
+        parent()
+    
+    spans = temp_storage.get_trace(trace_id)["spans"]
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span["name"], []).append(span)
+    
+    root = by_name["stack_test"][0]
+    outer = by_name["parent"][0]
+    assert root["parent_span_id"] is None
+    assert outer["parent_span_id"] == root["span_id"]
+    assert [c["parent_span_id"] for c in by_name["child"]] == [outer["span_id"]] * 2
+
+
+def test_tracing_disabled_at_runtime(temp_storage):
+    """Test that a disabled tracer runs observed functions without spans."""
+    tracer = init_tracer(storage=temp_storage)
+    
+    @observe()
+    def add_numbers(a, b):
+        return a + b
+    
+    trace_id = tracer.start_trace("disabled")
+    tracer.enabled = False
+    assert add_numbers(1, 2) == 3
+    tracer.enabled = True
+    
+    temp_storage.flush()
+    assert temp_storage.get_trace(trace_id)["spans"] == []
+
+
+def test_env_switch_parsing(monkeypatch):
+    """Test parsing of OPENCLAW_TRACING and OPENCLAW_SAMPLE values."""
+    from openclaw_observability.tracer import _env_enabled, _env_sample_rate
+    
+    for value, expected in [("0", False), ("off", False), ("False", False),
+                            ("1", True), ("true", True), ("yes", True)]:
+        monkeypatch.setenv("OPENCLAW_TRACING", value)
+        assert _env_enabled("OPENCLAW_TRACING") is expected
+    
+    for value, expected in [("0.25", 0.25), ("abc", 1.0), ("5", 1.0), ("-1", 0.0)]:
+        monkeypatch.setenv("OPENCLAW_SAMPLE", value)
+        assert _env_sample_rate("OPENCLAW_SAMPLE") == expected
+
+
+def _nested_list(levels):
+    value = []
+    for _ in range(levels):
+        value = [value]
+    return value
+
+
+def test_serialize_paths_agree(monkeypatch):
+    """Test that the orjson and pure-Python serializers produce the same output."""
+    import collections
+    import datetime
+    import enum
+    import uuid
+    from openclaw_observability import tracer as tracer_module
+    
+    class Color(str, enum.Enum):
+        RED = "red"
+    
+    class Level(enum.IntEnum):
+        HIGH = 3
+    
+    Point = collections.namedtuple("Point", "x y")
+    
+    class Score(float):
+        pass
+    
+    values = [
+        uuid.UUID(int=1),
+        Color.RED,
+        {"level": Level.HIGH, "when": datetime.datetime(2024, 1, 1)},
+        Point(1, 2),
+        collections.OrderedDict(a=[1, (2, 3)]),
+        {1, 2},
+        _nested_list(40),
+        _nested_list(300),
+        Score(0.5),
+        {"scores": [Score(0.25), Point(3, 4)]},
+        [float("nan"), float("inf"), {"x": float("-inf")}],
+    ]
+    
+    serialized = []
+    for orjson_available in (tracer_module.ORJSON_AVAILABLE, False):
+        monkeypatch.setattr(tracer_module, "ORJSON_AVAILABLE", orjson_available)
+        serialized.append([tracer_module._serialize_value(v) for v in values])
+    assert serialized[0] == serialized[1]
+    
+    result = serialized[1]
+    assert result[0] == str(uuid.UUID(int=1))
+    assert result[1] == "red"
+    assert result[3] == [1, 2]
+    assert result[6] == _nested_list(40)
+    assert result[8] == 0.5 and type(result[8]) is float
+    assert result[9] == {"scores": [0.25, [3, 4]]}
+    assert result[10] == [None, None, {"x": None}]
+    
+    # Nesting past the depth limit is summarized at the limit
+    deep = result[7]
+    for _ in range(tracer_module._MAX_SERIALIZE_DEPTH):
+        deep = deep[0]
+    assert deep["_type"] == "list"
+
+
+def test_serialize_cycles():
+    """Test that cyclic containers are summarized where they repeat."""
+    from openclaw_observability.tracer import _serialize_value
+    
+    cyclic = {"name": "node"}
+    cyclic["self"] = cyclic
+    cyclic["again"] = cyclic
+    shared = [1]
+    
+    result = _serialize_value({"cyclic": cyclic, "a": shared, "b": shared})
+    assert result["cyclic"]["name"] == "node"
+    assert result["cyclic"]["self"]["_type"] == "dict"
+    assert result["cyclic"]["again"]["_type"] == "dict"
+    # Shared but acyclic references are kept whole
+    assert result["a"] == result["b"] == [1]
+
+
+def test_sampling_keeps_trees_whole(temp_storage):
+    """Test that sampling never records a span without its parent."""
+    tracer = init_tracer(storage=temp_storage)
+    tracer.sample_rate = 0.5
+    random.seed(3)
+    
+    @observe()
+    def leaf():
+        return 1
+    
+    @observe()
+    def mid():
+        return leaf()
+    
+    @observe()
+    def top():
+        return mid()
+    
+    trace_ids = []
+    for _ in range(20):
+        with trace("sampled") as trace_id:
+            top()
+        trace_ids.append(trace_id)
+    # Outside any trace, each top-level call decides for its subtree
+    for _ in range(20):
+        top()
+    trace_ids.append(get_current_trace())
+    tracer.end_trace()
+    
+    counts = {"top": 0, "mid": 0, "leaf": 0}
+    for trace_id in trace_ids:
+        spans = temp_storage.get_trace(trace_id)["spans"]
+        span_ids = {s["span_id"] for s in spans}
+        for s in spans:
+            assert s["parent_span_id"] is None or s["parent_span_id"] in span_ids
+            if s["name"] in counts:
+                counts[s["name"]] += 1
+    assert 0 < counts["top"] < 40
+    assert counts["top"] == counts["mid"] == counts["leaf"]
+    assert 0 < len(temp_storage.list_traces()) < 21
+
+
+def test_input_binder_matches_signature_bind():
+    """Test that the argument binder agrees with Signature.bind + apply_defaults."""
+    from openclaw_observability.tracer import _make_input_binder
+    
+    def plain(a, b, c=3):
+        pass
+    
+    def varargs(a, *args, k=1, **kwargs):
+        pass
+    
+    def kinds(a, /, b, *, c, d=4):
+        pass
+    
+    cases = [
+        (plain, (1, 2), {}),
+        (plain, (1, 2, 5), {}),
+        (plain, (1,), {"b": 2}),
+        (plain, (), {"a": 1, "b": 2, "c": 5}),
+        (plain, (), {"c": 5, "b": 2, "a": 1}),
+        (plain, (1, 2), {"a": 1}),
+        (plain, (1, 2, 3, 4), {}),
+        (plain, (1,), {"b": 2, "x": 0}),
+        (varargs, (1, 2, 3), {}),
+        (varargs, (1,), {"k": 2, "extra": 3}),
+        (kinds, (1, 2), {"c": 3}),
+        (kinds, (1,), {"b": 2, "c": 3, "d": 5}),
+        (kinds, (), {"a": 1, "b": 2, "c": 3}),
+        (kinds, (1, 2, 3), {}),
+    ]
+    for func, args, kwargs in cases:
+        sig = inspect.signature(func)
+        try:
+            bound = sig.bind(*args, **kwargs)
+        except TypeError:
+            with pytest.raises(TypeError):
+                _make_input_binder(func)(args, kwargs)
+            continue
+        bound.apply_defaults()
+        assert _make_input_binder(func)(args, kwargs) == dict(bound.arguments), (func, args, kwargs)
+
+
+def test_background_span_writes(temp_storage):
+    """Test that queued span writes are visible once flushed."""
+    tracer = Tracer(storage=temp_storage)
+    
+    trace_id = tracer.start_trace("background_writes")
+    for i in range(20):
+        span = tracer.start_span(f"span_{i}")
+        tracer.end_span(span)
+    
+    temp_storage.flush()
+    trace_data = temp_storage.get_trace(trace_id)
+    assert len(trace_data["spans"]) == 20
+    assert temp_storage.lost_spans == 0
+
+
+def test_unencodable_outputs_keep_batch(temp_storage):
+    """Test that a span with non-JSON outputs doesn't lose its batch."""
+    tracer = Tracer(storage=temp_storage)
+    
+    trace_id = tracer.start_trace("bad_outputs")
+    for name, outputs in [
+        ("before", {"ok": 1}),
+        ("object", {"obj": object()}),
+        ("tuple_keys", {("a", 1): 2}),
+        ("after", {"ok": 2}),
+    ]:
+        span = tracer.start_span(name)
+        tracer.end_span(span, outputs=outputs)
+    tracer.end_trace()
+    
+    spans = {s["name"]: s for s in temp_storage.get_trace(trace_id)["spans"]}
+    assert {"before", "object", "tuple_keys", "after"} <= spans.keys()
+    assert spans["object"]["outputs"]["obj"]["_type"] == "object"
+    assert spans["tuple_keys"]["outputs"] == {"('a', 1)": 2}
+    assert [t["trace_id"] for t in temp_storage.list_traces()] == [trace_id]
+    assert temp_storage.lost_spans == 0
+
+
+def test_failed_batch_counts_lost_spans():
+    """Test that a batch the writer can't write is counted in lost_spans."""
+    def failing_write(by_trace):
+        raise RuntimeError("dictionary changed size during iteration")
+    
+    writer = _WriterThread(failing_write)
+    for i in range(3):
+        writer.submit("tr_x", f"span_{i}", {})
+    writer.flush()
+    assert writer.lost_spans == 3
+
+
+def test_full_queue_drops_oldest():
+    """Test that a full write queue drops the oldest spans and counts them."""
+    written = []
+    writer = _WriterThread(
+        lambda by_trace: written.extend(by_trace["tr_x"]), maxsize=3
+    )
+    # The thread is never started, so nothing drains the queue until flush()
+    for i in range(5):
+        writer.submit("tr_x", f"span_{i}", {})
+    assert writer.lost_spans == 2
+    
+    writer.flush()
+    assert [span_id for span_id, _ in written] == ["span_2", "span_3", "span_4"]
+
+
+def test_full_queue_writes_on_caller():
+    """Test that drop_on_full=False writes the backlog on the submitting thread."""
+    writes = []
+    
+    def record(by_trace):
+        writes.append((threading.current_thread(), [i for i, _ in by_trace["tr_x"]]))
+    
+    writer = _WriterThread(record, maxsize=3, drop_on_full=False)
+    for i in range(5):
+        writer.submit("tr_x", f"span_{i}", {})
+    assert writes == [(threading.current_thread(), ["span_0", "span_1", "span_2"])]
+    
+    writer.flush()
+    assert writes[-1][1] == ["span_3", "span_4"]
+    assert writer.lost_spans == 0
+
+
+def test_legacy_span_files(temp_storage):
+    """Test reading traces stored as one JSON file per span."""
+    root = Span(trace_id="tr_legacy", name="legacy", span_type=SpanType.ORCHESTRATION)
+    child = Span(trace_id="tr_legacy", parent_span_id=root.span_id, name="work")
+    for span in (child, root):
+        span.complete()
+    
+    trace_dir = temp_storage.base_dir / "tr_legacy"
+    trace_dir.mkdir()
+    for span in (root, child):
+        (trace_dir / f"{span.span_id}.json").write_text(json.dumps(span.to_dict(), indent=2))
+    
+    spans = temp_storage.get_trace("tr_legacy")["spans"]
+    assert [s["name"] for s in spans] == ["legacy", "work"]
+    
+    temp_storage.finalize_trace("tr_legacy")
+    assert temp_storage.list_traces()[0]["span_count"] == 2
+
+
+def test_index_persistence(temp_storage):
+    """Test that the trace index survives reopening the storage."""
+    tracer = Tracer(storage=temp_storage)
+    
+    trace_id = tracer.start_trace("indexed")
+    span = tracer.start_span("work")
+    tracer.end_span(span)
+    tracer.end_trace()
+    temp_storage.finalize_trace(trace_id)
+    temp_storage.flush()
+    
+    with FileStorage(base_dir=str(temp_storage.base_dir)) as reopened:
+        traces = reopened.list_traces()
+    assert [t["trace_id"] for t in traces] == [trace_id]
+
+
+def test_close_stops_writer():
+    """Test that closing storage writes pending spans and stops its thread."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = FileStorage(base_dir=tmpdir)
+        tracer = Tracer(storage=storage)
+        trace_id = tracer.start_trace("closing")
+        tracer.end_span(tracer.start_span("work"))
+        
+        storage.close()
+        assert not storage._writer.is_alive()
+        assert len(storage.get_trace(trace_id)["spans"]) == 1
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])